@@ -0,0 +1,124 @@
+"""Score a campaign list in the training_data.csv layout.
+
+Usage:
+    python batch_score.py clients.csv scores.csv
+    python batch_score.py clients.parquet scores.parquet --chunksize 200000
+
+The input is read and scored in fixed-size chunks, so memory stays bounded
+by the chunk size rather than the file size; a CSV with an up-to-date
+columnar copy (see columnar.py) is read from the copy. The output holds the
+response probability and the thresholded decision for every input row, in
+order; an input without rows gives an output with the columns only.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from columnar import iter_batches, resolve
+from pipeline import load_artifacts, load_threshold, predict_proba, decide
+
+CHUNKSIZE = 100_000
+
+
+def read_chunks(path, chunksize=CHUNKSIZE):
+    path = resolve(path)
+    if path.suffix == '.parquet':
+        yield from iter_batches(path, chunksize)
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.parquet = self.path.suffix == '.parquet'
+        self._writer = None
+        self._header = True
+
+    def write(self, frame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self._header else 'a', header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def empty_scores(id_column=None):
+    """A frame with the columns and types of the scores and no rows."""
+    scores = pd.DataFrame({'PROBABILITY': pd.Series(dtype='float64'), 'PREDICTION': pd.Series(dtype='int8')})
+    if id_column is not None:
+        scores.insert(0, id_column, pd.Series(dtype='int64'))
+    return scores
+
+
+def score_chunks(chunks, model, scaler, ordinal_encoder, threshold, id_column=None):
+    """Yield a frame of scores for every input chunk that has rows."""
+    for chunk in chunks:
+        # скейлер не принимает пустой массив, а файл из одного заголовка даёт такой фрагмент
+        if chunk.empty:
+            continue
+        probs = predict_proba(chunk, model, scaler, ordinal_encoder)
+        scores = pd.DataFrame({'PROBABILITY': probs, 'PREDICTION': decide(probs, threshold).astype('int8')})
+        if id_column is not None:
+            scores.insert(0, id_column, chunk[id_column].to_numpy())
+        yield scores
+
+
+def score_file(source, target, artifacts='.', chunksize=CHUNKSIZE, threshold=None, id_column=None, log=sys.stderr):
+    """Score ``source`` into ``target`` and return ``(rows, seconds)``.
+
+    Without an explicit ``threshold`` the one saved with the artifacts is used.
+    """
+    model, scaler, ordinal_encoder = load_artifacts(artifacts)
+    if threshold is None:
+        threshold = load_threshold(artifacts)
+    writer = ChunkWriter(target)
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for scores in score_chunks(read_chunks(source, chunksize), model, scaler, ordinal_encoder,
+                                   threshold, id_column):
+            writer.write(scores)
+            rows += len(scores)
+            elapsed = time.perf_counter() - start
+            print(f'{rows} rows, {rows / elapsed:,.0f} rows/sec', file=log)
+        if not rows:
+            writer.write(empty_scores(id_column))
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score clients in bulk with the saved model.')
+    parser.add_argument('source', help='CSV or Parquet file in the training_data.csv layout')
+    parser.add_argument('target', help='output file, .csv or .parquet')
+    parser.add_argument('--artifacts', default='.', help='directory with the pickled model, scaler and encoder')
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE, help='rows scored at a time')
+    parser.add_argument('--threshold', type=float,
+                        help='probability cutoff for a response, by default the one in artifacts.json')
+    parser.add_argument('--id-column', help='input column copied to the output to identify rows')
+    args = parser.parse_args(argv)
+
+    rows, seconds = score_file(args.source, args.target, args.artifacts, args.chunksize, args.threshold,
+                               args.id_column)
+    print(f'Scored {rows} rows in {seconds:.2f}s ({rows / max(seconds, 1e-9):,.0f} rows/sec)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""Timing benchmarks for loading, preprocessing, inference and the EDA figures.
+
+Usage:
+    python benchmark.py --output bench.json                  # run and save the results
+    python benchmark.py --compare bench.json                 # run and compare with a saved run
+    python benchmark.py --only predict --max-rows 100000
+
+Every benchmark is run several times; the median wall time and the median
+absolute deviation of the runs (the spread) are reported in seconds. With
+``--compare`` a benchmark is a regression when it is more than
+``--tolerance`` slower than in the baseline and the slowdown is also larger
+than ``--min-delta`` and than three times the spread of both runs, so the
+jitter of sub-millisecond benchmarks is not taken for a regression. The
+exit code is 1 if there is any.
+"""
+import argparse
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+import warnings
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from pipeline import FEATURES, INCOME_BINS, INCOME_LABELS, load_artifacts, load_threshold, replace_values
+
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000, 100_000, 1_000_000]
+# во сколько раз разница должна превышать разброс замеров, чтобы считаться замедлением
+NOISE_FACTOR = 3
+
+Timing = namedtuple('Timing', ['median', 'spread'])
+
+SIDEBAR_ROW = [30, 1, 'Высшее', 'Состою в браке', 0, 0, 1, 0, 1, 0, 1, 0, 'от 10000 до 20000 руб.', 20000, 'Торговля',
+               'Рабочий', 'Участие в основ. деятельности', 10]
+
+
+def measure(func, repeat=5, budget=2.0):
+    """``Timing`` of ``func()`` over up to ``repeat`` runs, stopping early after ``budget`` seconds."""
+    times = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t)
+        if time.perf_counter() - start > budget:
+            break
+    median = statistics.median(times)
+    return Timing(median, statistics.median(abs(t - median) for t in times))
+
+
+def synthetic_rows(source, n, seed=0):
+    """``n`` rows drawn independently from each column's values in ``source``."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({column: rng.choice(values.to_numpy(), size=n) for column, values in source[FEATURES].items()})
+
+
+def bench_load(results, repeat):
+    from columnar import read_dataset
+
+    for path in ['data.csv', 'training_data.csv']:
+        results[f'load/csv/{path}'] = measure(lambda: pd.read_csv(path), repeat)
+        results[f'load/dataset/{path}'] = measure(lambda: read_dataset(path), repeat)
+
+
+def bench_preprocess(results, repeat):
+    model, scaler, ordinal_encoder = load_artifacts()
+    frame = pd.DataFrame([SIDEBAR_ROW], columns=FEATURES)
+
+    results['preprocess/replace_values'] = measure(lambda: frame['FAMILY_INCOME'].apply(replace_values), repeat * 20)
+    frame['FAMILY_INCOME'] = frame['FAMILY_INCOME'].apply(replace_values)
+    cut = lambda: pd.cut(frame['PERSONAL_INCOME'], bins=INCOME_BINS, labels=INCOME_LABELS, include_lowest=True)
+    results['preprocess/pd.cut'] = measure(cut, repeat * 20)
+    frame['INCOME'] = cut()
+    results['preprocess/ordinal_encoder.transform'] = measure(lambda: ordinal_encoder.transform(frame), repeat * 20)
+    encoded = ordinal_encoder.transform(frame)
+    results['preprocess/scaler.transform'] = measure(lambda: scaler.transform(encoded), repeat * 20)
+
+    from fastpath import CompiledModel
+
+    compiled = CompiledModel(model, scaler, ordinal_encoder, load_threshold())
+    results['preprocess/compiled.predict_proba_one'] = measure(lambda: compiled.predict_proba_one(SIDEBAR_ROW),
+                                                               repeat * 200)
+
+
+def bench_predict(results, repeat, max_rows):
+    from pipeline import transform
+
+    model, scaler, ordinal_encoder = load_artifacts()
+    source = pd.read_csv('training_data.csv')
+    for n in [n for n in BATCH_SIZES if n <= max_rows]:
+        X = transform(synthetic_rows(source, n), scaler, ordinal_encoder)
+        results[f'predict_proba/{n}'] = measure(lambda: model.predict_proba(X), repeat if n < 100_000 else 3)
+
+
+def bench_figures(results, repeat):
+    import matplotlib
+
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from streamlit.logger import set_log_level
+
+    # без запущенного streamlit кэш предупреждает о каждой кэшированной функции, здесь это не нужно
+    set_log_level('error')
+    from dashboard import FIGURES, PNG_OPTIONS
+    from eda_stats import EdaStats
+
+    stats = EdaStats.from_file('data.csv')
+    results['eda/statistics'] = measure(lambda: EdaStats.from_file('data.csv'), repeat)
+
+    def render(draw):
+        draw(stats)
+        fig = plt.gcf()
+        fig.savefig(io.BytesIO(), **PNG_OPTIONS)
+        plt.close(fig)
+
+    for name, draw in FIGURES.items():
+        results[f'figure/{name}'] = measure(lambda: render(draw), min(repeat, 3))
+
+
+GROUPS = {
+    'load': lambda results, args: bench_load(results, args.repeat),
+    'preprocess': lambda results, args: bench_preprocess(results, args.repeat),
+    'predict': lambda results, args: bench_predict(results, args.repeat, args.max_rows),
+    'figures': lambda results, args: bench_figures(results, args.repeat),
+}
+
+
+def compare(results, baseline, tolerance, min_delta=0.0):
+    """Rows of ``(name, baseline, current, ratio, regressed)`` for the benchmarks in both runs.
+
+    ``results`` and ``baseline`` map names to ``Timing``; a run saved without
+    spreads can be passed with a spread of 0.
+    """
+    rows = []
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]
+        ratio = current.median / before.median if before.median else float('inf')
+        noise = max(min_delta, NOISE_FACTOR * (before.spread + current.spread))
+        regressed = ratio > 1 + tolerance and current.median - before.median > noise
+        rows.append((name, before.median, current.median, ratio, regressed))
+    return rows
+
+
+def load_report(path):
+    """The timings of a JSON file written with ``--output``."""
+    with open(path, encoding='utf-8') as f:
+        report = json.load(f)
+    spread = report.get('spread', {})
+    return {name: Timing(median, spread.get(name, 0.0)) for name, median in report['results'].items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark loading, preprocessing, inference and figures.')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before a regression, 0.2 = 20%%')
+    parser.add_argument('--min-delta', type=float, default=1e-4,
+                        help='smallest slowdown in seconds that can count as a regression')
+    parser.add_argument('--only', nargs='+', choices=list(GROUPS), help='run only these groups')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per benchmark')
+    parser.add_argument('--max-rows', type=int, default=BATCH_SIZES[-1], help='largest predict_proba batch')
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings('ignore')
+    results = {}
+    for group in args.only or GROUPS:
+        GROUPS[group](results, args)
+        print(f'{group}: done', file=sys.stderr)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': {name: timing.median for name, timing in results.items()},
+        'spread': {name: timing.spread for name, timing in results.items()},
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if not args.compare:
+        for name, timing in results.items():
+            print(f'{name:60} {timing.median * 1000:12.3f} ms  ± {timing.spread * 1000:.3f}')
+        return
+
+    rows = compare(results, load_report(args.compare), args.tolerance, args.min_delta)
+    for name, before, after, ratio, regressed in rows:
+        print(f'{name:60} {before * 1000:12.3f} -> {after * 1000:12.3f} ms  x{ratio:5.2f}'
+              f'{"  REGRESSION" if regressed else ""}')
+    regressions = sum(row[-1] for row in rows)
+    print(f'{regressions} regressions out of {len(rows)} benchmarks')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
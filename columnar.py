@@ -0,0 +1,221 @@
+"""Columnar copies of the CSV datasets.
+
+A CSV is converted to a Parquet file next to it (data.csv -> data.parquet)
+in two streaming passes: the first finds the smallest integer type that
+holds every numeric column, the second writes the chunks with that schema.
+Float columns that only ever hold whole numbers become integers too, other
+floats are kept as they are so the model sees the same values. String
+columns are dictionary-encoded by Parquet and come back as pandas
+categoricals, with the categories in order of first appearance.
+
+Usage:
+    python columnar.py convert data.csv training_data.csv
+    python columnar.py bench data.csv
+"""
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CHUNKSIZE = 500_000
+METADATA_KEY = b'columnar'
+INTEGER_TYPES = ['int8', 'int16', 'int32', 'int64']
+
+
+def columnar_path(path):
+    return Path(path).with_suffix('.parquet')
+
+
+def resolve(path):
+    """``path``, or its Parquet copy if one exists and is not older than it."""
+    path = Path(path)
+    if path.suffix == '.parquet':
+        return path
+    parquet = columnar_path(path)
+    if parquet.exists() and (not path.exists() or parquet.stat().st_mtime_ns >= path.stat().st_mtime_ns):
+        return parquet
+    return path
+
+
+@contextlib.contextmanager
+def atomic_path(target):
+    """A temporary path next to ``target`` that replaces it only if the block completes.
+
+    A write that fails halfway leaves no file behind, so a truncated copy
+    can never pass for an up-to-date one.
+    """
+    target = Path(target)
+    temporary = target.with_name(f'.{target.name}.{os.getpid()}.tmp')
+    try:
+        yield temporary
+        os.replace(temporary, target)
+    finally:
+        temporary.unlink(missing_ok=True)
+
+
+def _plan(source, chunksize):
+    """Target dtype for every column and the categories of the string columns."""
+    bounds = {}
+    categories = {}
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        for column, values in chunk.items():
+            if values.dtype == object:
+                seen = categories.setdefault(column, {})
+                for value in values.dropna().unique():
+                    seen.setdefault(value, None)
+                continue
+            whole = values.notna().all() and (values % 1 == 0).all()
+            low, high, was_whole = bounds.get(column, (np.inf, -np.inf, True))
+            bounds[column] = (min(low, values.min()), max(high, values.max()), was_whole and whole)
+
+    dtypes = {}
+    for column, (low, high, whole) in bounds.items():
+        if not whole:
+            dtypes[column] = 'float64'
+            continue
+        dtypes[column] = next(name for name in INTEGER_TYPES
+                              if np.iinfo(name).min <= low and high <= np.iinfo(name).max)
+    return dtypes, {column: list(seen) for column, seen in categories.items()}
+
+
+def convert(source, target=None, chunksize=CHUNKSIZE):
+    """Write the columnar copy of ``source`` and return its path."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    source = Path(source)
+    target = Path(target) if target else columnar_path(source)
+    dtypes, categories = _plan(source, chunksize)
+    metadata = {METADATA_KEY: json.dumps({'categories': categories}, ensure_ascii=False).encode('utf-8')}
+
+    with atomic_path(target) as temporary:
+        writer = None
+        try:
+            for chunk in pd.read_csv(source, chunksize=chunksize, dtype={c: str for c in categories}):
+                chunk = chunk.astype(dtypes)
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    schema = table.schema.with_metadata({**(table.schema.metadata or {}), **metadata})
+                    writer = pq.ParquetWriter(temporary, schema, use_dictionary=list(categories),
+                                              compression='snappy')
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+    return target
+
+
+def read_dataset(path, columns=None, categories=True):
+    """Load a dataset from its columnar copy if there is one, otherwise from the CSV.
+
+    With ``categories=False`` the string columns come back as plain objects,
+    as ``pd.read_csv`` gives them.
+    """
+    path = resolve(path)
+    if path.suffix != '.parquet':
+        return pd.read_csv(path, usecols=columns)
+
+    import pyarrow.parquet as pq
+
+    if not categories:
+        return pq.read_table(path, columns=columns).to_pandas()
+    order = {column: values for column, values in _categories(path).items() if columns is None or column in columns}
+    frame = pq.read_table(path, columns=columns, read_dictionary=list(order)).to_pandas()
+    for column, values in order.items():
+        frame[column] = frame[column].cat.set_categories(values)
+    return frame
+
+
+def iter_batches(path, batch_size=CHUNKSIZE, categories=True):
+    """Chunks of a columnar dataset, in the same form as ``read_dataset`` returns."""
+    import pyarrow.parquet as pq
+
+    order = _categories(path)
+    parquet = pq.ParquetFile(path, read_dictionary=list(order) if categories else None)
+    for batch in parquet.iter_batches(batch_size=batch_size):
+        frame = batch.to_pandas()
+        if categories:
+            for column, values in order.items():
+                frame[column] = frame[column].cat.set_categories(values)
+        yield frame
+
+
+def _categories(path):
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_schema(path).metadata or {}
+    if METADATA_KEY not in metadata:
+        return {}
+    return json.loads(metadata[METADATA_KEY])['categories']
+
+
+BENCH_SCRIPT = """
+import resource, sys, time
+start = time.perf_counter()
+import pandas as pd
+from columnar import read_dataset
+imported = time.perf_counter()
+path = sys.argv[1]
+frame = None if path == '-' else pd.read_csv(path) if path.endswith('.csv') else read_dataset(path)
+loaded = time.perf_counter()
+try:
+    # ru_maxrss наследует пик родителя через fork, VmHWM считается заново после exec
+    with open('/proc/self/status') as status:
+        rss = next(int(line.split()[1]) for line in status if line.startswith('VmHWM'))
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+memory = 0 if frame is None else frame.memory_usage(deep=True).sum()
+print(loaded - imported, loaded - start, rss, memory)
+"""
+
+
+def bench(source, repeat=3):
+    """Load time and peak RSS of the CSV and its columnar copy, each in a fresh process."""
+    source = Path(source)
+    parquet = columnar_path(source)
+    if resolve(source) != parquet:
+        convert(source, parquet)
+
+    def run(path):
+        results = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, '-c', BENCH_SCRIPT, str(path)], capture_output=True, text=True,
+                                 check=True, cwd=Path(__file__).parent).stdout.split()
+            results.append((float(out[0]), float(out[1]), int(out[2]), int(out[3])))
+        load, startup, rss, memory = min(results)
+        return {'load_s': round(load, 4), 'startup_s': round(startup, 4), 'peak_rss_mb': round(rss / 1024, 1),
+                'frame_mb': round(memory / 2 ** 20, 2)}
+
+    baseline = run('-')
+    report = {'baseline': baseline, 'csv': run(source.resolve()), 'parquet': run(parquet.resolve())}
+    report['csv']['size_mb'] = round(os.path.getsize(source) / 2 ** 20, 2)
+    report['parquet']['size_mb'] = round(os.path.getsize(parquet) / 2 ** 20, 2)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert CSV datasets to Parquet and compare loading them.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    to_parquet = commands.add_parser('convert', help='write a .parquet copy next to each CSV')
+    to_parquet.add_argument('sources', nargs='+')
+    to_parquet.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    compare = commands.add_parser('bench', help='compare load time and peak RSS of a CSV and its Parquet copy')
+    compare.add_argument('source')
+    compare.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.command == 'convert':
+        for source in args.sources:
+            print(convert(source, chunksize=args.chunksize))
+    else:
+        print(json.dumps(bench(args.source, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
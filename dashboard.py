@@ -0,0 +1,299 @@
+"""Cached statistics, artifacts and figures for the Streamlit app.
+
+The EDA charts are drawn from the aggregates of eda_stats.EdaStats rather
+than from raw rows. They come from the eda_stats.pickle store when one has
+been built, otherwise they are streamed from data.parquet or data.csv. The
+aggregates and every figure are cached under the sha256 of that file, so a
+rerun of the page (a slider move, a prediction) serves them from the cache,
+and a change to the file invalidates them. The artifacts and the image are
+loaded once per process.
+"""
+import hashlib
+import io
+import os
+import threading
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+import seaborn as sns
+import streamlit as st
+from pandas.api.types import is_numeric_dtype
+from PIL import Image
+
+from columnar import resolve
+from eda_stats import INCOME, EdaStats, file_sha256
+from fastpath import CompiledModel
+from pipeline import INCOME_LABELS, METADATA, SIDEBAR_FLAGS, load_artifacts, load_threshold
+from score_store import SCORE_STORE, LRUCache, ensure, model_version
+
+STATS_STORE = 'eda_stats.pickle'
+
+# то же, что делает st.pyplot при сохранении картинки
+PNG_OPTIONS = {'bbox_inches': 'tight', 'dpi': 200, 'format': 'png'}
+# шире этого st.image уменьшает картинку заново при каждом перезапуске страницы
+MAX_IMAGE_WIDTH = 1460
+
+COUNT_COLUMNS = ['Пол', 'Семейный_статус', 'Количество_детей', 'Количество_иждивенцев',
+                 'Статус_работника', 'Статус_пенсионера', 'Наличие_квартиры',
+                 'Собственный_автомобиль', 'Ссуды_клиента', 'Погашенные_ссуды',
+                 'Семейный_доход']
+
+LABELS = {
+    'Целевая_переменная': {0: 'Не было отклика', 1: 'Был отклик'},
+    'Пол': {0: 'Женщина', 1: 'Мужчина'},
+    'Статус_работника': {0: 'Неработающий', 1: 'Работающий'},
+    'Статус_пенсионера': {0: 'Не является пенсионером', 1: 'Является пенсионером'},
+    'Наличие_квартиры': {0: 'Нет квартиры', 1: 'Есть квартира'},
+}
+
+# порядок значений в "Семейном доходе" почему-то перемешан, надо это исправить
+FAMILY_INCOME_ORDER = ['свыше 50000 руб.', 'от 20000 до 50000 руб.', 'от 10000 до 20000 руб.', 'от 5000 до 10000 руб.',
+                       'до 5000 руб.']
+EDUCATION_ORDER = ['Ученая степень', 'Два и более высших образования', 'Высшее', 'Неоконченное высшее',
+                   'Среднее специальное', 'Среднее', 'Неполное среднее']
+
+# pyplot хранит текущую фигуру глобально, а сессии streamlit работают в разных потоках
+_PLOT_LOCK = threading.Lock()
+
+
+def file_digest(path):
+    """sha256 of ``path``; the hash is only recomputed when the file's size or mtime change."""
+    stat = os.stat(path)
+    return _digest(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+@st.cache_data(show_spinner=False)
+def _digest(path, mtime_ns, size):
+    return file_sha256(path)
+
+
+def stats_source(path):
+    """The statistics store if ``path`` is among its files, otherwise the data file itself.
+
+    A store without the current ``path`` (the file was edited or replaced
+    after the last ``eda_stats.py update``) would show other data than the
+    head table and the client lookup, so the file is streamed instead.
+    """
+    data, store = resolve(path), Path(STATS_STORE)
+    if store.exists():
+        # хранилище могли пополнить как из CSV, так и из его колоночной копии
+        digests = {file_digest(path), file_digest(data)}
+        if not digests.isdisjoint(load_stats(store, file_digest(store)).sources):
+            return store
+    return data
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_stats(path, digest):
+    path = Path(path)
+    if path.suffix == '.pickle':
+        return EdaStats.load(path)
+    return EdaStats.from_file(path)
+
+
+def artifacts_version(directory='.'):
+    """Hash of the pickled artifacts and of artifacts.json; it changes whenever train.py rewrites them.
+
+    The models, the score store and the what-if cache are all cached under
+    it, so after a retrain they are replaced together.
+    """
+    digests = f'{model_version(directory, digest=file_digest)}\n{file_digest(Path(directory) / METADATA)}'
+    return hashlib.sha256(digests.encode()).hexdigest()
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_models(version, directory='.'):
+    """``(model, scaler, ordinal_encoder, compiled_model)`` of the artifacts with this version."""
+    model, scaler, ordinal_encoder = load_artifacts(directory)
+    return model, scaler, ordinal_encoder, CompiledModel(model, scaler, ordinal_encoder, load_threshold(directory))
+
+
+def load_scores(source, version, directory='.'):
+    """``(store, what_if_cache)`` for the clients of ``source`` scored by the artifacts with this version.
+
+    The store is rebuilt when the data or the artifacts change.
+    """
+    source = resolve(source)
+    return _load_scores(str(source), file_digest(source), version, directory), what_if_cache(version)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_scores(source, source_digest, version, directory):
+    return ensure(source, SCORE_STORE, directory, source_digest)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def what_if_cache(version):
+    return LRUCache()
+
+
+def sidebar_values(features):
+    """``(values, exact)``: a stored client's features in the form the sidebar widgets take them.
+
+    ``exact`` is False when a value had to be rounded to fit a widget; the
+    stored probability then does not belong to the values in the form.
+    """
+    values = {}
+    exact = True
+    for name, value in features.items():
+        if name in SIDEBAR_FLAGS:
+            value = next((label for label, code in SIDEBAR_FLAGS[name].items() if code == value), value)
+        elif isinstance(value, float):
+            # поля ввода в боковой панели целочисленные
+            exact = exact and round(value) == value
+            value = round(value)
+        values[name] = value
+    return values, exact
+
+
+@st.cache_resource(show_spinner=False)
+def load_image(path):
+    with open(path, 'rb') as f:
+        return fit_width(f.read())
+
+
+def fit_width(image_data):
+    """Shrink an encoded image the way st.image would, so it is only done once."""
+    image = Image.open(io.BytesIO(image_data))
+    width, height = image.size
+    if width <= MAX_IMAGE_WIDTH:
+        return image_data
+    image = image.resize((MAX_IMAGE_WIDTH, int(1.0 * height * MAX_IMAGE_WIDTH / width)), resample=Image.BILINEAR)
+    output = io.BytesIO()
+    image.save(output, format=image.format or 'PNG')
+    return output.getvalue()
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def describe_table(digest, _stats):
+    return _stats.describe().drop('count')
+
+
+def percentage_table(stats, column, order=None):
+    contingency_table = stats.crosstab(column)
+    if order is not None:
+        contingency_table = contingency_table.reindex([v for v in order if v in contingency_table.index])
+    return contingency_table.apply(lambda x: x / x.sum() * 100, axis=1)
+
+
+def count_bars(stats, column):
+    # тот же порядок столбиков, что выбирает sns.countplot
+    counts = stats.value_counts(column)
+    if column in LABELS:
+        counts = counts.rename(index=LABELS[column])
+    elif is_numeric_dtype(counts.index):
+        counts = counts.sort_index()
+    if column == INCOME:
+        counts = counts.reindex(INCOME_LABELS, fill_value=0)
+    order = list(counts.index)
+    sns.barplot(x=order, y=counts.to_numpy(), order=order, hue=order, hue_order=order, palette='viridis',
+                legend=False)
+    plt.xlabel(column)
+    plt.ylabel('count')
+
+
+def age_histogram(stats):
+    counts = stats.value_counts('Возраст')
+    # веса уменьшают эффективный размер выборки в gaussian_kde, возвращаем ширину окна к исходной
+    effective = counts.sum() ** 2 / (counts ** 2).sum()
+    plt.figure(figsize=(10, 5))
+    palette = sns.color_palette("viridis", as_cmap=True)
+    sns.histplot(x=counts.index.to_numpy(), weights=counts.to_numpy(), bins=40, color=palette(0.6), kde=True,
+                 kde_kws={'bw_adjust': (effective / counts.sum()) ** 0.2})
+    plt.axvline(stats.mean()['Возраст'], color='darkslateblue', linestyle='--')
+    plt.xlabel('Возраст')
+    plt.title('Распределение клиентов по возрасту')
+
+
+def target_countplot(stats):
+    plt.figure(figsize=(10, 5))
+    count_bars(stats, 'Целевая_переменная')
+    plt.title('Распределение целевой переменной')
+
+
+def feature_countplots(stats):
+    plt.figure(figsize=(10, len(COUNT_COLUMNS) * 5))
+    for i, column in enumerate(COUNT_COLUMNS):
+        plt.subplot(len(COUNT_COLUMNS), 1, i + 1)
+        count_bars(stats, column)
+        plt.title(f'{column}')
+    plt.tight_layout()
+
+
+def correlation_heatmap(stats):
+    plt.figure(figsize=(12, 8))
+    sns.heatmap(stats.corr(), annot=True, cmap='coolwarm')
+    plt.title('Матрица корреляций числовых признаков', fontsize=20, pad=20)
+
+
+def age_boxplot(stats):
+    plt.figure(figsize=(10, 5))
+    boxes = stats.box_stats('Возраст')
+    colors = sns.color_palette('viridis', len(boxes))
+    # линии того же серого цвета, что рисует sns.boxplot
+    line = {'color': '.26', 'linewidth': 1}
+    artists = plt.gca().bxp(boxes, positions=range(len(boxes)), widths=0.8, capwidths=0.4, patch_artist=True,
+                            boxprops={'edgecolor': '.26', 'linewidth': 1}, medianprops=line, whiskerprops=line,
+                            capprops=line, flierprops={'markeredgecolor': '.26'})
+    for patch, color in zip(artists['boxes'], colors):
+        patch.set_facecolor(color)
+    plt.xlabel('Целевая_переменная')
+    plt.ylabel('Возраст')
+    plt.title('Распределение признака "Возраст" для каждого класса целевой переменной')
+
+
+def income_countplot(stats):
+    plt.figure(figsize=(10, 4))
+    count_bars(stats, INCOME)
+    plt.title('Распределение личного дохода клиента')
+    plt.tight_layout()
+
+
+def response_heatmap(column, title, height, cmap='coolwarm', order=None):
+    def draw(stats):
+        plt.figure(figsize=(10, height))
+        sns.heatmap(percentage_table(stats, column, order), annot=True, cmap=cmap, fmt=".2f")
+        plt.title(title, fontsize=15, pad=20)
+    return draw
+
+
+FIGURES = {
+    'age_histogram': age_histogram,
+    'target_countplot': target_countplot,
+    'feature_countplots': feature_countplots,
+    'correlation_heatmap': correlation_heatmap,
+    'age_boxplot': age_boxplot,
+    'closed_loans_heatmap': response_heatmap(
+        'Погашенные_ссуды', 'Корреляции между погашенными ссудами и откликом (в процентах)', 4, 'BuGn'),
+    'income_heatmap': response_heatmap(
+        INCOME, 'Корреляции между доходом и откликом (в процентах)', 4, 'BuGn'),
+    'income_countplot': income_countplot,
+    'family_income_heatmap': response_heatmap(
+        'Семейный_доход', 'Тепловая карта для семейного дохода (в процентах)', 4, order=FAMILY_INCOME_ORDER),
+    'education_heatmap': response_heatmap(
+        'Образование', 'Тепловая карта для уровня образования (в процентах)', 5, order=EDUCATION_ORDER),
+    'title_heatmap': response_heatmap(
+        'Должность', 'Тепловая карта для должности (в процентах)', 6),
+    'marital_status_heatmap': response_heatmap(
+        'Семейный_статус', 'Тепловая карта для семейного статуса (в процентах)', 4),
+    'industry_heatmap': response_heatmap(
+        'Отрасль_работы', 'Тепловая карта для отрасли работы клиента (в процентах)', 20),
+    'job_direction_heatmap': response_heatmap(
+        'Направление_деятельности', 'Тепловая карта для направления деятельности (в процентах)', 10),
+}
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def figure_png(name, digest, _stats):
+    """PNG of the EDA figure ``name`` drawn from the aggregates in ``_stats``."""
+    image = io.BytesIO()
+    with _PLOT_LOCK:
+        FIGURES[name](_stats)
+        fig = plt.gcf()
+        fig.savefig(image, **PNG_OPTIONS)
+        plt.close(fig)
+    return fit_width(image.getvalue())
+
+
+def show_figure(name, digest, stats):
+    st.image(figure_png(name, digest, stats), use_column_width=True)
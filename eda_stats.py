@@ -0,0 +1,342 @@
+"""Streaming statistics for the EDA section of the app.
+
+``EdaStats`` consumes the dataset chunk by chunk and keeps only mergeable
+aggregates:
+
+- means and the co-moment matrix of the numeric columns, combined across
+  chunks with the parallel Welford (Chan et al.) update, which gives the
+  variances and the correlation matrix;
+- the minimum and maximum of every numeric column;
+- joint counts of the values of every column with the target, which give
+  the value counts, the contingency tables and exact quantiles;
+- the same joint counts for the personal income bins.
+
+A numeric column outside ``COUNTED`` (personal income, work time) whose
+number of distinct values grows past ``MAX_DISTINCT`` switches to joint
+counts of log-spaced buckets instead of values, so memory stays bounded
+however many files are added. A bucket stands for its midpoint, which is
+within ``SKETCH_ACCURACY`` (0.5%) of every value in it, so from then on the
+quantiles, box plots and histograms of that column are approximate to that
+relative error. Below the cap, as for data.csv, everything is exact; means,
+deviations, correlations, minima and maxima always are.
+
+Two ``EdaStats`` can be merged, and the whole object is saved with joblib,
+so a new day of data only has to be read once.
+
+Usage:
+    python eda_stats.py update eda_stats.pickle data.csv     # add a file to the store
+    python eda_stats.py show eda_stats.pickle
+"""
+import argparse
+import hashlib
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from columnar import iter_batches, resolve
+from pipeline import INCOME_BINS, INCOME_LABELS
+
+TARGET = 'Целевая_переменная'
+INCOME = 'Доход'
+PERSONAL_INCOME = 'Личный_доход'
+CHUNKSIZE = 100_000
+# числовые столбцы с небольшим числом значений, их частоты всегда точные
+COUNTED = ('Целевая_переменная', 'Возраст', 'Пол', 'Количество_детей', 'Количество_иждивенцев', 'Статус_работника',
+           'Статус_пенсионера', 'Наличие_квартиры', 'Собственный_автомобиль', 'Ссуды_клиента', 'Погашенные_ссуды')
+# сколько разных значений столбца считается точно, прежде чем перейти к корзинам
+MAX_DISTINCT = 10_000
+SKETCH_ACCURACY = 0.005
+_GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+# формат сохранённого объекта, хранилища старого формата надо пересобрать
+FORMAT = 3
+
+
+def sketch_keys(values):
+    """The bucket of every value: midpoint of a log-spaced bucket, within ``SKETCH_ACCURACY`` of the value."""
+    magnitude = np.abs(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        index = np.ceil(np.log(magnitude) / np.log(_GAMMA))
+        keys = np.sign(values) * 2 * _GAMMA ** index / (_GAMMA + 1)
+    return np.where(magnitude == 0, 0.0, keys)
+
+
+class EdaStats:
+    """Mergeable aggregates of a dataset with a binary target."""
+
+    def __init__(self, target=TARGET, exclude=('ID_объекта',), counted=COUNTED, max_distinct=MAX_DISTINCT):
+        self.format = FORMAT
+        self.target = target
+        self.exclude = tuple(exclude)
+        self.counted = tuple(counted)
+        self.max_distinct = max_distinct
+        self.columns = None
+        self.numeric = None
+        # числовые столбцы, которые считаются по корзинам, а не по значениям
+        self.sketched = []
+        # первые строки в исходном виде, вместе с исключёнными столбцами
+        self.head = None
+        self.rows = 0
+        self.sources = {}
+        # моменты по строкам без пропусков в числовых столбцах
+        self.n = 0
+        self.mean_ = None
+        self.comoment = None
+        self.joint = {}
+
+    def update(self, chunk):
+        """Add the rows of ``chunk`` to the aggregates."""
+        if self.head is None:
+            self.head = chunk.head()
+        elif len(self.head) < 5:
+            self.head = pd.concat([self.head, chunk.head(5 - len(self.head))])
+        chunk = chunk.drop(columns=[c for c in self.exclude if c in chunk.columns])
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+            self.numeric = [c for c in self.columns if is_numeric_dtype(chunk[c])]
+            self._init_numeric()
+        self.rows += len(chunk)
+        self.minimum = np.fmin(self.minimum, chunk[self.numeric].min().to_numpy(dtype=np.float64))
+        self.maximum = np.fmax(self.maximum, chunk[self.numeric].max().to_numpy(dtype=np.float64))
+
+        values = chunk[self.numeric].to_numpy(dtype=np.float64)
+        values = values[~np.isnan(values).any(axis=1)]
+        if len(values):
+            mean = values.mean(axis=0)
+            centered = values - mean
+            self._combine(len(values), mean, centered.T @ centered)
+
+        chunk = chunk.assign(**{INCOME: pd.cut(chunk[PERSONAL_INCOME], bins=INCOME_BINS, labels=INCOME_LABELS,
+                                               include_lowest=True)},
+                             **{c: sketch_keys(chunk[c].to_numpy(dtype=np.float64)) for c in self.sketched})
+        for column in self.columns + [INCOME]:
+            counts = chunk.groupby([column, self.target], observed=True, sort=False).size()
+            joint = self.joint.setdefault(column, {})
+            for key, count in zip(counts.index.tolist(), counts.tolist()):
+                joint[key] = joint.get(key, 0) + count
+        self._limit_distinct()
+        return self
+
+    def _limit_distinct(self):
+        """Switch the columns with more than ``max_distinct`` values to buckets."""
+        for column in self.numeric:
+            if column in self.counted or column == self.target or column in self.sketched:
+                continue
+            joint = self.joint.get(column, {})
+            # пар (значение, цель) не больше чем вдвое больше значений, так что множество строится редко
+            if len(joint) > self.max_distinct and len({value for value, _ in joint}) > self.max_distinct:
+                self.joint[column] = _bucket_counts(joint)
+                self.sketched.append(column)
+
+    def _init_numeric(self):
+        self.mean_ = np.zeros(len(self.numeric))
+        self.comoment = np.zeros((len(self.numeric), len(self.numeric)))
+        self.minimum = np.full(len(self.numeric), np.nan)
+        self.maximum = np.full(len(self.numeric), np.nan)
+
+    def _combine(self, n, mean, comoment):
+        total = self.n + n
+        delta = mean - self.mean_
+        self.comoment = self.comoment + comoment + np.outer(delta, delta) * (self.n * n / total)
+        self.mean_ = self.mean_ + delta * (n / total)
+        self.n = total
+
+    def merge(self, other):
+        """Fold the aggregates of ``other`` into this object."""
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.columns, self.numeric = list(other.columns), list(other.numeric)
+            self.head = other.head
+            self._init_numeric()
+        elif other.columns != self.columns:
+            raise ValueError('cannot merge statistics of datasets with different columns')
+        # столбец, который хоть в одном из объектов ушёл в корзины, переводится в корзины и в другом
+        for column in other.sketched:
+            if column not in self.sketched:
+                self.joint[column] = _bucket_counts(self.joint.get(column, {}))
+                self.sketched.append(column)
+        self.minimum = np.fmin(self.minimum, other.minimum)
+        self.maximum = np.fmax(self.maximum, other.maximum)
+        if other.n:
+            self._combine(other.n, other.mean_, other.comoment)
+        self.rows += other.rows
+        self.sources.update(other.sources)
+        for column, counts in other.joint.items():
+            if column in self.sketched and column not in other.sketched:
+                counts = _bucket_counts(counts)
+            joint = self.joint.setdefault(column, {})
+            for key, count in counts.items():
+                joint[key] = joint.get(key, 0) + count
+        self._limit_distinct()
+        return self
+
+    def add_file(self, path, chunksize=CHUNKSIZE):
+        """Stream a CSV or Parquet file into the aggregates; a file already added is skipped.
+
+        Returns True if the file was read.
+        """
+        path = resolve(path)
+        digest = file_sha256(path)
+        if digest in self.sources:
+            return False
+        if path.suffix == '.parquet':
+            chunks = iter_batches(path, chunksize, categories=False)
+        else:
+            chunks = pd.read_csv(path, chunksize=chunksize)
+        for chunk in chunks:
+            self.update(chunk)
+        self.sources[digest] = str(path)
+        return True
+
+    @classmethod
+    def from_file(cls, path, chunksize=CHUNKSIZE, **kwargs):
+        stats = cls(**kwargs)
+        stats.add_file(path, chunksize)
+        return stats
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        stats = joblib.load(path)
+        if getattr(stats, 'format', 1) != FORMAT:
+            raise ValueError(f'{path} was saved by an older version, rebuild it')
+        return stats
+
+    def crosstab(self, column):
+        """Counts of ``column`` values against the target, like ``pd.crosstab``."""
+        counts = pd.Series(self.joint[column], dtype='int64')
+        counts.index.names = [column, self.target]
+        table = counts.unstack(fill_value=0).sort_index(axis=1)
+        if column == INCOME:
+            return table.reindex(INCOME_LABELS, fill_value=0)
+        return table.sort_index()
+
+    def value_counts(self, column):
+        """Counts of ``column`` values, in order of first appearance; bucket midpoints for a sketched column."""
+        counts = {}
+        for (value, _), count in self.joint[column].items():
+            counts[value] = counts.get(value, 0) + count
+        return pd.Series(counts, dtype='int64', name='count')
+
+    def _series(self, values):
+        return pd.Series(values, index=self.numeric)
+
+    def mean(self):
+        return self._series(self.mean_)
+
+    def std(self):
+        return self._series(np.sqrt(np.diag(self.comoment) / (self.n - 1)))
+
+    def corr(self):
+        scale = np.sqrt(np.diag(self.comoment))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.comoment / np.outer(scale, scale)
+        np.fill_diagonal(corr, 1.0)
+        return pd.DataFrame(corr, index=self.numeric, columns=self.numeric)
+
+    def quantiles(self, column, qs):
+        """Quantiles of ``column`` with linear interpolation, as pandas computes them.
+
+        Exact for a counted column, within ``SKETCH_ACCURACY`` for a sketched one.
+        """
+        result = _quantiles(self.value_counts(column), qs)
+        if column in self.sketched:
+            position = self.numeric.index(column)
+            result = list(np.clip(result, self.minimum[position], self.maximum[position]))
+        return result
+
+    def describe(self):
+        """The same table as ``DataFrame.describe()`` for the numeric columns."""
+        table = {}
+        mean, std = self.mean(), self.std()
+        for position, column in enumerate(self.numeric):
+            q25, q50, q75 = self.quantiles(column, [0.25, 0.5, 0.75])
+            table[column] = [self.value_counts(column).sum(), mean[column], std[column], self.minimum[position],
+                             q25, q50, q75, self.maximum[position]]
+        return pd.DataFrame(table, index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'])
+
+    def box_stats(self, column):
+        """Per-target box plot statistics of ``column`` for ``Axes.bxp``."""
+        counts = self.crosstab(column)
+        stats = []
+        for target in counts.columns:
+            part = counts[target][counts[target] > 0]
+            values = part.index.to_numpy(dtype=np.float64)
+            q1, med, q3 = _quantiles(part, [0.25, 0.5, 0.75])
+            iqr = q3 - q1
+            inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+            stats.append({
+                'label': target, 'med': med, 'q1': q1, 'q3': q3,
+                'whislo': inside.min(), 'whishi': inside.max(),
+                'fliers': values[(values < inside.min()) | (values > inside.max())],
+                'mean': np.average(values, weights=part.to_numpy()),
+            })
+        return stats
+
+
+def _bucket_counts(joint):
+    """Joint counts of values turned into joint counts of their buckets."""
+    buckets = {}
+    if not joint:
+        return buckets
+    values, targets = zip(*joint)
+    for key, target, count in zip(sketch_keys(np.array(values, dtype=np.float64)).tolist(), targets, joint.values()):
+        buckets[key, target] = buckets.get((key, target), 0) + count
+    return buckets
+
+
+def _quantiles(counts, qs):
+    counts = counts.sort_index()
+    values = counts.index.to_numpy(dtype=np.float64)
+    cumulative = counts.to_numpy().cumsum()
+    result = []
+    for q in qs:
+        position = q * (cumulative[-1] - 1)
+        low, high = int(np.floor(position)), int(np.ceil(position))
+        a, b = values[np.searchsorted(cumulative, [low, high], side='right')]
+        result.append(a + (b - a) * (position - low))
+    return result
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Maintain the EDA statistics store.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    update = commands.add_parser('update', help='add data files to the store, creating it if needed')
+    update.add_argument('store')
+    update.add_argument('sources', nargs='+')
+    update.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    show = commands.add_parser('show', help='print the aggregated statistics')
+    show.add_argument('store')
+    args = parser.parse_args(argv)
+
+    if args.command == 'update':
+        stats = EdaStats.load(args.store) if Path(args.store).exists() else EdaStats()
+        for source in args.sources:
+            added = stats.add_file(source, args.chunksize)
+            print(f'{source}: {"added" if added else "already in the store"}')
+        stats.save(args.store)
+        print(f'{stats.rows} rows from {len(stats.sources)} files')
+    else:
+        stats = EdaStats.load(args.store)
+        print(f'{stats.rows} rows from {len(stats.sources)} files')
+        print(stats.describe().to_string())
+
+
+if __name__ == '__main__':
+    # сохранённый объект должен ссылаться на класс модуля eda_stats, а не __main__, иначе приложение его не загрузит
+    import eda_stats
+
+    eda_stats.main()
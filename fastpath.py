@@ -0,0 +1,155 @@
+"""Pandas-free scoring of a single client.
+
+The encoder mappings, the scaler statistics and the logistic regression
+coefficients are read out of the pickled artifacts once and turned into
+plain lookup tables, so scoring a row is a handful of dict lookups and one
+NumPy dot product. The arithmetic is the same as in the sklearn path run on
+one row, so the probabilities match it bit for bit.
+
+Usage:
+    python fastpath.py training_data.csv            # parity check on every row
+    python fastpath.py training_data.csv --rows 1000
+"""
+import argparse
+import math
+import sys
+import time
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+
+from pipeline import (FEATURES, INCOME_BINS, INCOME_LABELS, SIDEBAR_FLAGS, load_artifacts, load_threshold,
+                      predict_proba, replace_values)
+
+UNKNOWN = -1.0
+MISSING = -2.0
+
+
+def is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class CompiledModel:
+    """Logistic regression with its preprocessing folded into lookup tables."""
+
+    def __init__(self, model, scaler, ordinal_encoder, threshold):
+        if len(model.classes_) != 2 or model.coef_.shape[0] != 1:
+            raise ValueError('only a binary logistic regression can be compiled')
+        if not (scaler.with_mean and scaler.with_std):
+            raise ValueError('the scaler must both center and scale the data')
+        if ordinal_encoder.handle_unknown != 'value' or ordinal_encoder.handle_missing != 'value':
+            raise ValueError('the encoder must map unknown and missing values to constants')
+
+        self.columns = list(scaler.feature_names_in_)
+        if self.columns[:len(FEATURES)] != FEATURES or self.columns[len(FEATURES):] != ['INCOME']:
+            raise ValueError(f'unexpected feature order: {self.columns}')
+
+        self.mean = scaler.mean_.copy()
+        self.scale = scaler.scale_.copy()
+        self.coef = np.ascontiguousarray(model.coef_.ravel(), dtype=np.float64)
+        self.intercept = float(model.intercept_[0])
+        self.threshold = threshold
+
+        self.tables = {}
+        for item in ordinal_encoder.mapping:
+            self.tables[item['col']] = {key: float(code) for key, code in item['mapping'].items()
+                                        if not is_missing(key)}
+        self.income_table = [self.tables['INCOME'][label] for label in INCOME_LABELS]
+        self.family_income = {}
+        self._income_position = FEATURES.index('PERSONAL_INCOME')
+        self._converters = [self._converter(name) for name in FEATURES]
+
+    @classmethod
+    def from_directory(cls, directory='.'):
+        return cls(*load_artifacts(directory), threshold=load_threshold(directory))
+
+    def _converter(self, name):
+        if name in self.tables:
+            table = self.tables[name]
+            return lambda value: MISSING if is_missing(value) else table.get(value, UNKNOWN)
+        if name in SIDEBAR_FLAGS:
+            flags = SIDEBAR_FLAGS[name]
+            return lambda value: float(flags.get(value, value))
+        if name == 'FAMILY_INCOME':
+            return self._family_income
+        return float
+
+    def _income(self, personal_income):
+        # то же, что pd.cut(..., include_lowest=True): интервалы (a, b], первый включает 0
+        if is_missing(personal_income) or not INCOME_BINS[0] <= personal_income <= INCOME_BINS[-1]:
+            return MISSING
+        return self.income_table[max(bisect_left(INCOME_BINS, personal_income) - 1, 0)]
+
+    def _family_income(self, value):
+        if not isinstance(value, str):
+            return float(value)
+        number = self.family_income.get(value)
+        if number is None:
+            number = self.family_income[value] = float(replace_values(value))
+        return number
+
+    def vector(self, record):
+        """Encoded, not yet scaled feature vector for one record.
+
+        ``record`` is either a mapping with the ``FEATURES`` keys or a
+        sequence of the 18 values in that order, as the sidebar collects them.
+        """
+        values = [record[name] for name in FEATURES] if isinstance(record, dict) else record
+        row = [convert(value) for convert, value in zip(self._converters, values)]
+        row.append(self._income(row[self._income_position]))
+        return np.array(row)
+
+    def score(self, vector):
+        """Response probability of a vector returned by ``vector``."""
+        x = (vector - self.mean) / self.scale
+        return float(expit(x @ self.coef + self.intercept))
+
+    def predict_proba_one(self, record):
+        return self.score(self.vector(record))
+
+    def predict_one(self, record):
+        return self.predict_proba_one(record) >= self.threshold
+
+
+def check(path, artifacts='.', rows=None, log=sys.stdout):
+    """Compare the compiled model with the sklearn path row by row; return the number of mismatches."""
+    model, scaler, ordinal_encoder = load_artifacts(artifacts)
+    compiled = CompiledModel(model, scaler, ordinal_encoder, load_threshold(artifacts))
+    frame = pd.read_csv(path, nrows=rows)
+    records = frame[FEATURES].to_dict('records')
+
+    mismatches = 0
+    sklearn_time = compiled_time = 0.0
+    for i, record in enumerate(records):
+        start = time.perf_counter()
+        expected = predict_proba(frame.iloc[[i]], model, scaler, ordinal_encoder)[0]
+        sklearn_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = compiled.predict_proba_one(record)
+        compiled_time += time.perf_counter() - start
+
+        if actual != expected:
+            mismatches += 1
+            print(f'row {i}: sklearn {expected!r}, compiled {actual!r}', file=log)
+
+    n = len(records)
+    print(f'{n} rows, {mismatches} mismatches', file=log)
+    print(f'sklearn: {sklearn_time / n * 1e6:.1f} us/row, compiled: {compiled_time / n * 1e6:.1f} us/row', file=log)
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check the compiled model against the sklearn pipeline.')
+    parser.add_argument('source', nargs='?', default='training_data.csv', help='CSV in the training_data.csv layout')
+    parser.add_argument('--artifacts', default='.', help='directory with the pickled model, scaler and encoder')
+    parser.add_argument('--rows', type=int, help='only check the first ROWS rows')
+    args = parser.parse_args(argv)
+
+    sys.exit(1 if check(args.source, args.artifacts, args.rows) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""Opt-in timing, memory counters and profiling of the app's stages.
+
+Off unless one of the environment variables below is set:
+
+- ``APP_DIAGNOSTICS=1`` times every stage of a page run (wall and CPU time,
+  resident memory before and after), shows the table in a collapsed
+  "Диагностика" panel at the bottom of the page and appends one JSON line
+  per run to ``APP_DIAGNOSTICS_LOG`` (diagnostics.jsonl by default);
+- ``APP_DIAGNOSTICS=memory`` also traces Python allocations with tracemalloc
+  and reports the peak of every stage, which slows the app down noticeably;
+- ``APP_PROFILE=rerun.prof`` runs the whole page under cProfile and writes
+  the stats of the last run to that file, for ``python -m pstats`` or
+  snakeviz.
+
+Usage in main.py:
+
+    with start_run() as run:
+        with run.stage('data'):
+            ...
+
+The run is finished when the block exits, also when Streamlit stops the
+script halfway for a rerun or the page raises: the profiler is stopped and
+the run is logged with the name of the exception, and the panel is only
+drawn for a page that ran to the end.
+
+When everything is off ``start_run`` returns a run whose ``stage`` is a
+shared no-op context manager, so an instrumented stage costs one method
+call.
+
+    python instrumentation.py diagnostics.jsonl      # summary of the logged runs
+"""
+import argparse
+import contextlib
+import cProfile
+import json
+import os
+import statistics
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+MODE = os.environ.get('APP_DIAGNOSTICS', '').strip().lower()
+LOG_PATH = os.environ.get('APP_DIAGNOSTICS_LOG', 'diagnostics.jsonl')
+PROFILE_PATH = os.environ.get('APP_PROFILE', '')
+
+ENABLED = MODE not in ('', '0', 'false', 'no', 'off')
+TRACE_MEMORY = MODE == 'memory'
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+_LOG_LOCK = threading.Lock()
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def rss_mb():
+    """Resident memory of the process in MiB; the peak where the current value is not available."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE / 2 ** 20
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class _NullRun:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+    def finish(self, interrupted=None):
+        pass
+
+
+class Run:
+    """Measurements of one run of the page."""
+
+    def __init__(self, profile_path=PROFILE_PATH, log_path=LOG_PATH, trace_memory=TRACE_MEMORY):
+        self.stages = []
+        self.log_path = log_path
+        self.profile_path = profile_path
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.profiler = None
+        if profile_path:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.started = time.time()
+        self.start = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.finish(interrupted=exc_type.__name__ if exc_type is not None else None)
+        return False
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        rss = rss_mb()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            allocated = tracemalloc.get_traced_memory()[0]
+        cpu = time.thread_time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {
+                'stage': name,
+                'seconds': time.perf_counter() - start,
+                'cpu_seconds': time.thread_time() - cpu,
+                'rss_mb': rss_mb(),
+            }
+            record['rss_delta_mb'] = record['rss_mb'] - rss
+            if self.trace_memory:
+                # пик считается по всему процессу, при нескольких открытых страницах он общий
+                record['peak_alloc_mb'] = (tracemalloc.get_traced_memory()[1] - allocated) / 2 ** 20
+            self.stages.append(record)
+
+    def summary(self):
+        return {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'pid': os.getpid(),
+            'thread': threading.current_thread().name,
+            'seconds': time.perf_counter() - self.start,
+            'rss_mb': rss_mb(),
+            'stages': self.stages,
+        }
+
+    def finish(self, interrupted=None):
+        """Stop the profiler and log the run; the diagnostics panel is shown if the page ran to the end."""
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile_path)
+        summary = self.summary()
+        summary['interrupted'] = interrupted
+        if self.log_path:
+            line = json.dumps(summary, ensure_ascii=False)
+            with _LOG_LOCK, open(self.log_path, 'a', encoding='utf-8') as log:
+                log.write(line + '\n')
+        if interrupted is None:
+            show_panel(summary, self.profile_path)
+        return summary
+
+
+def start_run():
+    """A ``Run`` when instrumentation is on, otherwise a no-op stand-in."""
+    if ENABLED or PROFILE_PATH:
+        return Run(log_path=LOG_PATH if ENABLED else None)
+    return _NullRun()
+
+
+def show_panel(summary, profile_path=None):
+    import pandas as pd
+    import streamlit as st
+
+    with st.expander('Диагностика', expanded=False):
+        st.write(f"Полный прогон страницы: {summary['seconds'] * 1000:.1f} мс, "
+                 f"память процесса {summary['rss_mb']:.0f} МБ")
+        if summary['stages']:
+            table = pd.DataFrame(summary['stages']).set_index('stage')
+            table[['seconds', 'cpu_seconds']] *= 1000
+            st.dataframe(table.rename(columns={'seconds': 'ms', 'cpu_seconds': 'cpu_ms'}).round(2),
+                         use_container_width=True)
+        if profile_path:
+            st.write(f'Профиль cProfile записан в `{profile_path}`.')
+
+
+def summarize(path):
+    """Median and maximum time of every stage over the runs logged in ``path``."""
+    times = defaultdict(list)
+    runs = 0
+    with open(path, encoding='utf-8') as log:
+        for line in log:
+            runs += 1
+            for record in json.loads(line)['stages']:
+                times[record['stage']].append(record['seconds'])
+    return runs, {stage: (statistics.median(values), max(values), len(values)) for stage, values in times.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarize the stage timings logged by the app.')
+    parser.add_argument('log', nargs='?', default=LOG_PATH, help='JSON lines file written with APP_DIAGNOSTICS set')
+    args = parser.parse_args(argv)
+
+    runs, stages = summarize(args.log)
+    print(f'{runs} runs')
+    for stage, (median, worst, count) in sorted(stages.items(), key=lambda item: -item[1][0]):
+        print(f'{stage:40} median {median * 1000:10.2f} ms   max {worst * 1000:10.2f} ms   ({count} runs)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Measure latency and throughput of the prediction service.
+
+Usage:
+    python server.py --port 8000 &
+    python load_test.py --url http://127.0.0.1:8000/predict --concurrency 32 --requests 5000
+
+Rows of training_data.csv are sent one per request from ``--concurrency``
+threads; p50/p99 latency and requests/sec are printed at the end.
+"""
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pipeline import FEATURES
+
+
+def load_payloads(path='training_data.csv', limit=None):
+    frame = pd.read_csv(path, nrows=limit)[FEATURES]
+    return [json.dumps(record, ensure_ascii=False).encode('utf-8') for record in frame.to_dict('records')]
+
+
+def post(url, body):
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def run(url, payloads, requests, concurrency):
+    """Return per-request latencies in seconds and the wall time of the run."""
+    bodies = [payloads[i % len(payloads)] for i in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda body: post(url, body), bodies))
+    return np.array(latencies), time.perf_counter() - start
+
+
+def report(latencies, elapsed, concurrency):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'p50_ms': round(float(p50), 3),
+        'p99_ms': round(float(p99), 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the prediction service.')
+    parser.add_argument('--url', default='http://127.0.0.1:8000/predict')
+    parser.add_argument('--data', default='training_data.csv', help='file the request payloads are taken from')
+    parser.add_argument('--concurrency', type=int, default=16, help='number of clients sending at the same time')
+    parser.add_argument('--requests', type=int, default=2000, help='total number of requests to send')
+    args = parser.parse_args(argv)
+
+    payloads = load_payloads(args.data, limit=args.requests)
+    latencies, elapsed = run(args.url, payloads, args.requests, args.concurrency)
+    print(json.dumps(report(latencies, elapsed, args.concurrency)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Preprocessing and scoring shared by the Streamlit app and the batch tools.
+
+The steps mirror the ones used in EDA_DP_ML.ipynb when the artifacts were
+fitted: the family income label is turned into a number, the personal income
+is binned into INCOME, the categorical columns go through the ordinal
+encoder and the whole row through the scaler.
+"""
+import json
+import re
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+FEATURES = ['AGE', 'GENDER', 'EDUCATION', 'MARITAL_STATUS', 'CHILD_TOTAL', 'DEPENDANTS', 'SOCSTATUS_WORK_FL',
+            'SOCSTATUS_PENS_FL', 'FL_PRESENCE_FL', 'OWN_AUTO', 'LOAN_NUM_TOTAL', 'LOAN_NUM_CLOSED', 'FAMILY_INCOME',
+            'PERSONAL_INCOME', 'GEN_INDUSTRY', 'GEN_TITLE', 'JOB_DIR', 'WORK_TIME']
+
+INCOME_BINS = [0, 10000, 30000, 50000, 100000, 250000]
+INCOME_LABELS = ["до 10000 руб.", "от 10000 до 30000 руб.", "от 30000 до 50000 руб.", "от 50000 до 100000 руб.",
+                 "от 100000 до 250000 руб."]
+
+# значения, которые приходят из боковой панели приложения
+SIDEBAR_FLAGS = {
+    'GENDER': {'Женщина': 0, 'Мужчина': 1},
+    'SOCSTATUS_WORK_FL': {'Работает': 1, 'Не работает': 0},
+    'SOCSTATUS_PENS_FL': {'Пенсионер': 1, 'Не пенсионер': 0},
+    'FL_PRESENCE_FL': {'Есть': 1, 'Нет': 0},
+}
+
+ARTIFACTS = ('model.pickle', 'scaler.pickle', 'encoder.pickle')
+# порог и сведения об обучении, которые пишет train.py
+METADATA = 'artifacts.json'
+
+
+def load_artifacts(directory='.'):
+    """Return ``(model, scaler, ordinal_encoder)`` unpickled from ``directory``."""
+    directory = Path(directory)
+    return tuple(joblib.load(directory / name) for name in ARTIFACTS)
+
+
+def load_metadata(directory='.'):
+    with open(Path(directory) / METADATA, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_threshold(directory='.'):
+    """Probability cutoff for a response, chosen when the artifacts were trained."""
+    return load_metadata(directory)['threshold']
+
+
+def replace_values(x):
+    # среднее значение, если формат "от и до"
+    if "от" in x and "до" in x:
+        numbers = [int(n) for n in re.findall(r"\d+", x)]
+        return sum(numbers) / len(numbers)
+    # в другом случае сохраняем одно число
+    else:
+        number = re.search(r"\d+", x).group()
+        return int(number)
+
+
+def prepare(frame):
+    """Bring a frame in the training_data.csv layout to the columns the encoder expects.
+
+    The binary flags and FAMILY_INCOME may still be text labels as the sidebar
+    shows them, INCOME is always recomputed from PERSONAL_INCOME, and any
+    extra columns (TARGET, IDs) are dropped.
+    """
+    frame = frame[FEATURES].copy()
+    for column, mapping in SIDEBAR_FLAGS.items():
+        if not is_numeric_dtype(frame[column]):
+            frame[column] = frame[column].map(lambda x: mapping.get(x, x)).astype('int64')
+    family_income = frame['FAMILY_INCOME']
+    if not is_numeric_dtype(family_income):
+        # меток всего несколько, поэтому разбираем каждую один раз
+        labels = {x: replace_values(x) for x in family_income.unique()}
+        frame['FAMILY_INCOME'] = family_income.map(labels).astype('float64')
+    frame['INCOME'] = pd.cut(frame['PERSONAL_INCOME'], bins=INCOME_BINS, labels=INCOME_LABELS, include_lowest=True)
+    return frame
+
+
+def transform(frame, scaler, ordinal_encoder):
+    return scaler.transform(ordinal_encoder.transform(prepare(frame)))
+
+
+def predict_proba(frame, model, scaler, ordinal_encoder):
+    """Probability of a response for every row of ``frame``."""
+    return model.predict_proba(transform(frame, scaler, ordinal_encoder))[:, 1]
+
+
+def decide(probs, threshold):
+    return np.asarray(probs) >= threshold
@@ -0,0 +1,218 @@
+"""Precomputed response probabilities of the known clients.
+
+``build`` scores the whole of data.csv once, in chunks, and writes the
+client IDs, the probabilities and the 18 features to scores.parquet. The
+schema metadata records the hash of the model artifacts and of the data
+file the scores came from, so ``ensure`` can tell a store that is out of
+date and rebuild it. ``ScoreStore`` keeps the columns as they are read, in
+Arrow arrays with the strings dictionary-encoded, and finds a client by
+binary search in a sorted NumPy array of the IDs; a lookup converts only
+that client's row to Python values. Only probabilities are stored, the
+decision is taken with the current threshold.
+
+``LRUCache`` holds the scores of edited ("what if") feature vectors, which
+are not in the store.
+
+Usage:
+    python score_store.py build data.csv                # writes scores.parquet
+    python score_store.py show scores.parquet 59910150
+"""
+import argparse
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+
+import numpy as np
+
+from batch_score import read_chunks
+from columnar import atomic_path, resolve
+from eda_stats import file_sha256
+from pipeline import ARTIFACTS, FEATURES, load_artifacts, load_threshold, predict_proba
+
+SCORE_STORE = 'scores.parquet'
+ID_COLUMN = 'ID_объекта'
+# столбцы data.csv в порядке FEATURES
+DATA_COLUMNS = ['Возраст', 'Пол', 'Образование', 'Семейный_статус', 'Количество_детей', 'Количество_иждивенцев',
+                'Статус_работника', 'Статус_пенсионера', 'Наличие_квартиры', 'Собственный_автомобиль',
+                'Ссуды_клиента', 'Погашенные_ссуды', 'Семейный_доход', 'Личный_доход', 'Отрасль_работы',
+                'Должность', 'Направление_деятельности', 'Время_работы']
+METADATA_KEY = b'score_store'
+CHUNKSIZE = 100_000
+WHAT_IF_CACHE_SIZE = 4096
+
+Client = namedtuple('Client', ['id', 'probability', 'features'])
+
+
+def model_version(directory='.', digest=file_sha256):
+    """Hash of the pickled model, scaler and encoder in ``directory``."""
+    digests = [digest(Path(directory) / name) for name in ARTIFACTS]
+    return hashlib.sha256('\n'.join(digests).encode()).hexdigest()
+
+
+def build(source='data.csv', target=SCORE_STORE, artifacts='.', chunksize=CHUNKSIZE):
+    """Score every client of ``source`` and write the store; return the number of rows."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    source = resolve(source)
+    model, scaler, ordinal_encoder = load_artifacts(artifacts)
+    metadata = {METADATA_KEY: json.dumps({
+        'model_version': model_version(artifacts),
+        'source': str(source),
+        'source_sha256': file_sha256(source),
+    }).encode('utf-8')}
+
+    rows = 0
+    # метаданные объявляют хранилище актуальным, поэтому файл появляется только целиком
+    with atomic_path(target) as temporary:
+        writer = None
+        try:
+            for chunk in read_chunks(source, chunksize):
+                features = chunk[DATA_COLUMNS].set_axis(FEATURES, axis=1)
+                table = features.assign(PROBABILITY=predict_proba(features, model, scaler, ordinal_encoder))
+                table.insert(0, ID_COLUMN, chunk[ID_COLUMN].to_numpy())
+                table = pa.Table.from_pandas(table, preserve_index=False)
+                if writer is None:
+                    schema = table.schema.with_metadata({**(table.schema.metadata or {}), **metadata})
+                    writer = pq.ParquetWriter(temporary, schema, compression='snappy')
+                writer.write_table(table.cast(writer.schema))
+                rows += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+    return rows
+
+
+def read_metadata(path):
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_schema(path).metadata or {}
+    return json.loads(metadata[METADATA_KEY]) if METADATA_KEY in metadata else {}
+
+
+def is_current(path, source, version, source_digest=None):
+    """Whether the store at ``path`` holds the scores of ``source`` by the model with hash ``version``."""
+    if not Path(path).exists():
+        return False
+    metadata = read_metadata(path)
+    source_digest = source_digest or file_sha256(resolve(source))
+    return metadata.get('model_version') == version and metadata.get('source_sha256') == source_digest
+
+
+def ensure(source='data.csv', target=SCORE_STORE, artifacts='.', source_digest=None):
+    """Open the store, building it first if it is missing or out of date."""
+    if not is_current(target, source, model_version(artifacts), source_digest):
+        build(source, target, artifacts)
+    return ScoreStore.load(target)
+
+
+class ScoreStore:
+    """Stored probabilities and features of the known clients, indexed by ID."""
+
+    def __init__(self, ids, probabilities, features, metadata=None):
+        """``features`` maps every feature to an Arrow array of the values, in the order of ``ids``."""
+        ids = np.asarray(ids, dtype=np.int64)
+        # отсортированные ID и номера их строк: поиск двоичный, без словаря на каждого клиента
+        self.positions = np.argsort(ids, kind='stable')
+        self.ids = ids[self.positions]
+        duplicates = self.ids[1:][np.diff(self.ids) == 0]
+        if len(duplicates):
+            raise ValueError(f'duplicate {ID_COLUMN} {duplicates[0]} in the score store')
+        self.probabilities = np.asarray(probabilities, dtype=np.float64)
+        self.features = dict(features)
+        self.metadata = metadata or {}
+
+    @classmethod
+    def load(cls, path=SCORE_STORE):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pq.read_schema(path)
+        strings = [name for name in FEATURES if pa.types.is_string(schema.field(name).type)]
+        table = pq.read_table(path, columns=[ID_COLUMN, 'PROBABILITY', *FEATURES], read_dictionary=strings)
+        features = {name: table.column(name) for name in FEATURES}
+        return cls(table.column(ID_COLUMN).to_numpy(), table.column('PROBABILITY').to_numpy(), features,
+                   read_metadata(path))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lookup(self, client_id):
+        """The ``Client`` with this ID, or None; a string ID such as a text field gives is accepted too."""
+        try:
+            client_id = int(client_id)
+            index = int(np.searchsorted(self.ids, client_id))
+        except (TypeError, ValueError, OverflowError):
+            return None
+        if index == len(self.ids) or self.ids[index] != client_id:
+            return None
+        position = int(self.positions[index])
+        return Client(client_id, float(self.probabilities[position]),
+                      {name: values[position].as_py() for name, values in self.features.items()})
+
+
+class LRUCache:
+    """Thread-safe least-recently-used mapping with a fixed number of entries."""
+
+    def __init__(self, maxsize=WHAT_IF_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build and query the precomputed scores of the known clients.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    create = commands.add_parser('build', help='score every client of a data file into the store')
+    create.add_argument('source', nargs='?', default='data.csv')
+    create.add_argument('--output', default=SCORE_STORE)
+    create.add_argument('--artifacts', default='.', help='directory with the pickled model, scaler and encoder')
+    create.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    show = commands.add_parser('show', help='print the stored score of clients')
+    show.add_argument('store')
+    show.add_argument('ids', nargs='+')
+    show.add_argument('--artifacts', default='.', help='directory whose threshold and model hash are used')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        rows = build(args.source, args.output, args.artifacts, args.chunksize)
+        print(f'{rows} clients scored into {args.output}')
+        return
+
+    store = ScoreStore.load(args.store)
+    if store.metadata.get('model_version') != model_version(args.artifacts):
+        print('warning: the store was built with other artifacts, rebuild it')
+    threshold = load_threshold(args.artifacts)
+    for client_id in args.ids:
+        client = store.lookup(client_id)
+        if client is None:
+            print(f'{client_id}: not in the store')
+            continue
+        print(f'{client.id}: probability {client.probability:.4f}, response {client.probability >= threshold}')
+        print(json.dumps(client.features, ensure_ascii=False, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""Standalone JSON prediction service.
+
+Usage:
+    python server.py --port 8000
+
+POST /predict with a JSON object holding the 18 sidebar fields (keys as in
+``pipeline.FEATURES``, values either as the sidebar shows them or already
+encoded), or a list of such objects. The answer holds the probability and
+the thresholded decision for each of them.
+
+The artifacts are loaded once at startup. Requests that arrive within
+``--window-ms`` of each other are stacked into one frame and scored with a
+single ``predict_proba`` call by a background worker.
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from pipeline import FEATURES, load_artifacts, load_threshold, predict_proba
+
+
+class MicroBatcher:
+    """Collects records from many threads and scores them together."""
+
+    def __init__(self, model, scaler, ordinal_encoder, threshold, window_ms=2.0, max_batch=256):
+        self.model = model
+        self.scaler = scaler
+        self.ordinal_encoder = ordinal_encoder
+        self.threshold = threshold
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, record):
+        future = Future()
+        self._queue.put((record, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._score(batch)
+
+    def _score(self, batch):
+        records = [record for record, _ in batch]
+        try:
+            probs = predict_proba(pd.DataFrame.from_records(records, columns=FEATURES),
+                                  self.model, self.scaler, self.ordinal_encoder)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # одна некорректная запись не должна ломать ответы остальным
+            for item in batch:
+                self._score([item])
+            return
+        for (_, future), prob in zip(batch, probs):
+            future.set_result({'probability': float(prob), 'prediction': int(prob >= self.threshold)})
+
+
+def parse_records(body):
+    payload = json.loads(body)
+    records = payload if isinstance(payload, list) else [payload]
+    for record in records:
+        if not isinstance(record, dict):
+            raise ValueError('each record must be a JSON object')
+        missing = [name for name in FEATURES if name not in record]
+        if missing:
+            raise ValueError(f'missing fields: {", ".join(missing)}')
+    return records, isinstance(payload, list)
+
+
+def make_handler(batcher):
+    class PredictHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send(404, {'error': 'not found'})
+                return
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            try:
+                records, many = parse_records(body)
+            except ValueError as e:
+                self._send(400, {'error': str(e)})
+                return
+            futures = [batcher.submit(record) for record in records]
+            try:
+                results = [future.result() for future in futures]
+            except Exception as e:
+                self._send(422, {'error': str(e)})
+                return
+            self._send(200, results if many else results[0])
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send(200, {'status': 'ok'})
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def _send(self, status, payload):
+            data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return PredictHandler
+
+
+class PredictServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # очередь по умолчанию (5) переполняется уже при нескольких десятках клиентов
+    request_queue_size = 1024
+
+
+def make_server(host='127.0.0.1', port=8000, artifacts='.', window_ms=2.0, max_batch=256):
+    model, scaler, ordinal_encoder = load_artifacts(artifacts)
+    batcher = MicroBatcher(model, scaler, ordinal_encoder, load_threshold(artifacts), window_ms=window_ms,
+                           max_batch=max_batch)
+    return PredictServer((host, port), make_handler(batcher))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve model predictions over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--artifacts', default='.', help='directory with the pickled model, scaler and encoder')
+    parser.add_argument('--window-ms', type=float, default=2.0, help='how long to wait for more requests to batch')
+    parser.add_argument('--max-batch', type=int, default=256, help='largest number of records scored at once')
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.artifacts, args.window_ms, args.max_batch)
+    print(f'Serving on http://{args.host}:{args.port}/predict')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Rebuild the model artifacts from training_data.csv.
+
+Usage:
+    python train.py                              # writes the artifacts into the current directory
+    python train.py --output build/ --jobs 8
+
+Repeats the training from EDA_DP_ML.ipynb: the ordinal encoder and the
+scaler are fitted on the whole table, the logistic regression is chosen by a
+10-fold grid search over ``PARAM_GRID`` on an 80% split, and the threshold is
+the one that maximizes F1 on the remaining 20%. The result is written to
+encoder.pickle, scaler.pickle, model.pickle and artifacts.json.
+
+The grid search runs every (fold, parameters) pair in a process pool. Each
+worker fits the encoder and scaler of a fold once, on that fold's training
+part only, and reuses them for every parameter set. The folds, the split and
+the solver are all seeded, so a run gives the same artifacts on any number
+of cores.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import category_encoders as ce
+import joblib
+import numpy as np
+import sklearn
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score, precision_recall_curve
+from sklearn.model_selection import ParameterGrid, StratifiedKFold, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from columnar import atomic_path, read_dataset, resolve
+from eda_stats import file_sha256
+from pipeline import ARTIFACTS, METADATA, prepare
+
+CATEGORICAL = ['EDUCATION', 'MARITAL_STATUS', 'GEN_INDUSTRY', 'GEN_TITLE', 'JOB_DIR', 'INCOME']
+PARAM_GRID = {'penalty': ['l1', 'l2'], 'C': [0.1, 1, 10]}
+FOLDS = 10
+RANDOM_STATE = 42
+
+
+def make_model(**params):
+    return LogisticRegression(random_state=RANDOM_STATE, solver='liblinear', class_weight='balanced', max_iter=1000,
+                              **params)
+
+
+def fit_preprocessing(X):
+    ordinal_encoder = ce.OrdinalEncoder(cols=CATEGORICAL)
+    scaler = StandardScaler()
+    scaler.fit(ordinal_encoder.fit_transform(X))
+    return ordinal_encoder, scaler
+
+
+def transform(X, ordinal_encoder, scaler):
+    return scaler.transform(ordinal_encoder.transform(X))
+
+
+# состояние процесса пула: данные передаются один раз при запуске процесса
+_X = _y = _folds = None
+
+
+def _init_worker(X, y, folds):
+    global _X, _y, _folds
+    _X, _y, _folds = X, y, folds
+
+
+@lru_cache(maxsize=None)
+def _fold_matrices(fold):
+    train, test = _folds[fold]
+    ordinal_encoder, scaler = fit_preprocessing(_X.iloc[train])
+    return (transform(_X.iloc[train], ordinal_encoder, scaler), _y[train],
+            transform(_X.iloc[test], ordinal_encoder, scaler), _y[test])
+
+
+def _score(task):
+    fold, params = task
+    X_train, y_train, X_test, y_test = _fold_matrices(fold)
+    model = make_model(**params).fit(X_train, y_train)
+    return fold, f1_score(y_test, model.predict(X_test))
+
+
+def grid_search(X, y, jobs=None):
+    """Mean F1 over the folds for every parameter set, and the best parameters."""
+    candidates = list(ParameterGrid(PARAM_GRID))
+    folds = list(StratifiedKFold(n_splits=FOLDS).split(X, y))
+    tasks = [(fold, params) for fold in range(FOLDS) for params in candidates]
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(X, y, folds)) as pool:
+        scores = list(pool.map(_score, tasks, chunksize=len(candidates)))
+
+    means = np.zeros(len(candidates))
+    for (fold, params), (_, score) in zip(tasks, scores):
+        means[candidates.index(params)] += score / FOLDS
+    # как в GridSearchCV: при равенстве побеждает первый набор параметров
+    best = candidates[int(np.argmax(means))]
+    return [{'params': params, 'mean_f1': float(score)} for params, score in zip(candidates, means)], best
+
+
+def best_threshold(y_true, probs):
+    precision, recall, thresholds = precision_recall_curve(y_true, probs)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        f1_scores = 2 * precision * recall / (precision + recall)
+    max_index = np.nanargmax(f1_scores)
+    return float(thresholds[max_index]), float(f1_scores[max_index])
+
+
+def train(source='training_data.csv', output='.', jobs=None, log=print):
+    start = time.perf_counter()
+    # в метаданные попадает файл, который действительно прочитан, в том числе колоночная копия
+    source = resolve(source)
+    data = read_dataset(source, categories=False)
+    y = data['TARGET'].to_numpy()
+    X = prepare(data)
+
+    ordinal_encoder, scaler = fit_preprocessing(X)
+    X_train, X_test, y_train, y_test = train_test_split(transform(X, ordinal_encoder, scaler), y, train_size=0.8,
+                                                        random_state=RANDOM_STATE)
+    X_cv, _, y_cv, _ = train_test_split(X, y, train_size=0.8, random_state=RANDOM_STATE)
+    results, best = grid_search(X_cv.reset_index(drop=True), y_cv, jobs)
+    for result in results:
+        log(f"{result['params']}: F1 {result['mean_f1']:.4f}")
+    log(f'best parameters: {best}')
+
+    model = make_model(**best).fit(X_train, y_train)
+    threshold, test_f1 = best_threshold(y_test, model.predict_proba(X_test)[:, 1])
+    log(f'threshold {threshold} (F1 {test_f1:.4f} on the test split)')
+
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    # каждый файл заменяется целиком, artifacts.json последним: работающее приложение не прочтёт недописанный файл
+    for name, artifact in zip(ARTIFACTS, (model, scaler, ordinal_encoder)):
+        with atomic_path(output / name) as temporary:
+            joblib.dump(artifact, temporary)
+    metadata = {
+        'threshold': threshold,
+        'params': best,
+        'cv_results': results,
+        'test_f1': test_f1,
+        'training_data': {'path': str(source), 'sha256': file_sha256(source), 'rows': len(data)},
+        'artifacts': {name: file_sha256(output / name) for name in ARTIFACTS},
+        'versions': {'scikit-learn': sklearn.__version__, 'category_encoders': ce.__version__},
+    }
+    with atomic_path(output / METADATA) as temporary:
+        temporary.write_text(json.dumps(metadata, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+    log(f'artifacts written to {output.resolve()} in {time.perf_counter() - start:.1f}s')
+    return metadata
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Retrain the model and rewrite the artifacts.')
+    parser.add_argument('source', nargs='?', default='training_data.csv', help='CSV or Parquet training table')
+    parser.add_argument('--output', default='.', help='directory the artifacts are written to')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='worker processes for the grid search')
+    args = parser.parse_args(argv)
+
+    train(args.source, args.output, args.jobs)
+
+
+if __name__ == '__main__':
+    main()